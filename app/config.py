@@ -1,10 +1,12 @@
 from pydantic_settings import BaseSettings
+from functools import lru_cache
 from typing import Optional
 
 class Settings(BaseSettings):
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8006
+    API_WORKERS: int = 1  # uvicorn worker processes (ignored when DEBUG reloads)
     DEBUG: bool = False
     
     # Database
@@ -13,17 +15,27 @@ class Settings(BaseSettings):
     # GEHistoricalImagery
     GEHISTORICALIMAGERY_PATH: str = "/app/gehinix.sh"
     
-    # AWS S3
-    AWS_ACCESS_KEY_ID: str
-    AWS_SECRET_ACCESS_KEY: str
+    # AWS S3 (credentials are only read when the S3 client is first built;
+    # if unset, boto3 falls back to its default credential chain)
+    AWS_ACCESS_KEY_ID: Optional[str] = None
+    AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_S3_BUCKET_NAME: str = "empverify"
     AWS_S3_REGION: str = "eu-north-1"
     
-    # Gemini
-    GEMINI_API_KEY: str
+    # Gemini (only required once an analysis actually runs)
+    GEMINI_API_KEY: Optional[str] = None
+    GEMINI_IMAGE_MAX_SIZE: int = 1024  # longest side (px) of each year's tile in the analysis mosaic
     
-    # Storage
-    TEMP_STORAGE_PATH: str = "./storage/temp"
+    # Storage (unset: tmpfs at /dev/shm/geofy when it has room, else ./storage/temp)
+    TEMP_STORAGE_PATH: Optional[str] = None
+    TMPFS_MIN_FREE_MB: int = 512  # below this much free tmpfs, fall back to disk
+    
+    # Processing
+    IMAGERY_MAX_CONCURRENCY: int = 4  # concurrent downloads (and, separately, uploads) per job
+    CONVERT_PROCESS_WORKERS: int = 0  # >0 runs GeoTIFF->PNG conversion in a process pool of this size
+    PNG_COMPRESS_LEVEL: int = 1  # zlib level 0-9; higher = smaller S3 objects, slower encode
+    AVAILABILITY_CACHE_TTL_SECONDS: int = 86400  # memoize availability per ~110m bucket
+    AVAILABILITY_CACHE_MAX_ENTRIES: int = 4096
     
     # Webhooks
     WEBHOOK_SIGNING_SECRET: Optional[str] = None  # If set, payloads are HMAC signed
@@ -37,4 +49,11 @@ class Settings(BaseSettings):
         env_file = ".env"
         extra = "ignore"  # This allows extra fields in .env without errors
 
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings instance (parsed once, then cached).
+    Modules bind `settings` at import, so cache_clear() only affects later callers.
+    """
+    return Settings()
+
+settings = get_settings()
\ No newline at end of file
@@ -1,17 +1,48 @@
+import orjson
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
+def _json_serializer(value) -> str:
+    """Serialize JSON columns with orjson (much faster than stdlib json for large blobs)"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
 # Create engine
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads
 )
 
 # Session factory - used for creating new sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# asyncio driver used by background jobs for each supported backend
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def _async_database_url(url: str) -> URL:
+    """Point DATABASE_URL at its backend's asyncio driver, whichever sync driver it names"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(
+            f"DATABASE_URL backend '{backend}' has no supported asyncio driver "
+            f"(supported: {', '.join(sorted(_ASYNC_DRIVERS))})"
+        )
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+
+# Async engine/session factory - used by background jobs so commits don't block the event loop
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base for models
 Base = declarative_base()
 
@@ -1,10 +1,16 @@
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+from typing import List, Optional
 import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-from .database import engine, Base, get_db, SessionLocal
+from .database import engine, Base, get_db, AsyncSessionLocal
 from .models import Job, JobStatus
 from .schemas import (
     CaptureRequest, CaptureResponse, JobStatusResponse,
@@ -13,104 +19,164 @@ from .schemas import (
 from .services import ImageryService, WebhookService
 from .config import settings
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+logging.basicConfig(
+    level=logging.DEBUG if settings.DEBUG else logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+# httpx logs every webhook request at INFO, pyvips every PNG encode's threadpool
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("pyvips").setLevel(logging.WARNING)
 
 # Initialize FastAPI
 app = FastAPI(
     title="Geofy Historical Imagery API",
     description="Historical satellite imagery capture for municipal property monitoring",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Initialize services
 imagery_service = ImageryService()
 webhook_service = WebhookService()
 
+# Optional process pool for the CPU-bound GeoTIFF -> PNG conversion (None = default thread pool).
+# forkserver, not fork: workers start lazily from a process already running threads
+# (executor, aiosqlite, GDAL/libvips), and a forked child can inherit a held lock
+convert_executor = (
+    ProcessPoolExecutor(
+        max_workers=settings.CONVERT_PROCESS_WORKERS,
+        mp_context=multiprocessing.get_context("forkserver")
+    )
+    if settings.CONVERT_PROCESS_WORKERS > 0 else None
+)
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    """Release pooled HTTP connections and conversion workers"""
+    await webhook_service.close()
+    if convert_executor is not None:
+        convert_executor.shutdown(wait=False, cancel_futures=True)
+
+async def _update_job(db: AsyncSession, job_id: str, **values):
+    """Write only the given columns of a job row (avoids re-flushing JSON results)"""
+    await db.execute(update(Job).where(Job.id == job_id).values(**values))
+    await db.commit()
+
+# Minimum progress delta (percent) worth a database write
+PROGRESS_REPORT_STEP = 5
+
 # Background processing function
-async def process_imagery_job(job_id: str, coordinates: str, zoom: int, callback_url: str = None):
-    """Process imagery capture job"""
-    # Create a new database session for this background task
-    db = SessionLocal()
+async def process_imagery_job(
+    job_id: str,
+    coordinates: str,
+    zoom: int,
+    callback_url: str = None,
+    availability: Optional[asyncio.Task] = None
+):
+    """Process imagery capture job (`availability` is an already-started availability check)"""
+    # Create a new (async) database session for this background task
+    db = AsyncSessionLocal()
+    temp_files = []  # every file written for this job, removed however the job ends
     
     try:
-        job = db.query(Job).filter(Job.id == job_id).first()
+        job = await db.get(Job, job_id)
         
         if not job:
-            print(f"Error: Job {job_id} not found")
+            logger.error("Job %s not found", job_id)
             return
         
         # Update status
-        job.status = JobStatus.PROCESSING
-        job.progress = 10
-        db.commit()
+        await _update_job(db, job_id, status=JobStatus.PROCESSING, progress=10)
         
         # Parse coordinates
         lat, lon = map(float, coordinates.split(','))
         
         # Check availability
-        job.progress = 20
-        db.commit()
-        available_dates = imagery_service.check_availability(lat, lon)
+        await _update_job(db, job_id, progress=20)
+        last_reported = 20
+        if availability is not None:
+            available_dates = await availability
+        else:
+            available_dates = await imagery_service.check_availability(lat, lon)
         
         # Filter for 2018-2025 and select exactly one date per year (prefer latest)
-        target_years = list(range(2018, 2026))
-        # Map year -> list of dates for that year
-        dates_by_year = {}
+        target_years = {str(y) for y in range(2018, 2026)}
+        # Map year -> latest date for that year (dates are YYYY-MM-DD, so string order is date order)
+        latest_by_year = {}
         for d in available_dates:
-            try:
-                y = int(d.split('-')[0])
-            except Exception:
-                continue
-            if y in target_years:
-                dates_by_year.setdefault(y, []).append(d)
-        # Pick latest date per year to maximize recency
-        dates_to_download = []
-        years_for_download = []
-        for y in sorted(dates_by_year.keys()):
-            chosen = sorted(dates_by_year[y])[-1]
-            dates_to_download.append(chosen)
-            years_for_download.append(y)
+            y = d[:4]
+            if y in target_years and d > latest_by_year.get(y, ''):
+                latest_by_year[y] = d
+        # (year, date) pairs are computed once and carried through the whole pipeline
+        downloads = [(int(y), latest_by_year[y]) for y in sorted(latest_by_year)]
+        dates_to_download = [date for _, date in downloads]
+        years_for_download = [year for year, _ in downloads]
         
         if not dates_to_download:
             raise Exception("No imagery available for 2018-2025")
         
-        # Download and process each year
-        results = []
+        # Download and process each year concurrently. Each stage has its own cap, so a year
+        # frees its download slot (provider limit) as soon as it moves on to conversion and
+        # upload; conversion is bounded by its executor. The stages run inside the per-job
+        # TaskGroup below, so a failed year also stops siblings waiting on any stage
         progress_per_year = 60 / len(dates_to_download)
+        download_slots = asyncio.Semaphore(settings.IMAGERY_MAX_CONCURRENCY)
+        upload_slots = asyncio.Semaphore(settings.IMAGERY_MAX_CONCURRENCY)
+        # The session is shared by all year tasks; AsyncSession forbids concurrent use
+        db_lock = asyncio.Lock()
+        completed = 0
         
-        for idx, date in enumerate(dates_to_download):
-            # Download - returns path like: /temp/jobid_2018-01-01.tif
-            tif_path = imagery_service.download_imagery(
-                lat, lon, date, zoom, job_id
+        async def process_year(year: int, date: str):
+            nonlocal completed, last_reported
+            # Tracked before the download starts: a failed or cancelled CLI run can
+            # leave a partial file behind
+            temp_files.append(str(imagery_service.download_path(job_id, date)))
+            async with download_slots:
+                # Download - returns path like: /temp/jobid_2018-01-01.tif
+                tif_path = await imagery_service.download_imagery(lat, lon, date, zoom, job_id)
+            
+            # Convert to PNG - kept in memory, never written to disk
+            png_bytes, analysis_jpeg = await asyncio.get_running_loop().run_in_executor(
+                convert_executor, imagery_service.convert_geotiff_to_png, tif_path
             )
             
-            # Convert to PNG - returns path like: /temp/jobid_2018-01-01.png
-            png_path = imagery_service.convert_geotiff_to_png(tif_path)
+            async with upload_slots:
+                # Upload to S3
+                urls = await asyncio.to_thread(imagery_service.upload_to_s3, png_bytes, job_id, year)
             
-            # Upload to S3
-            year = int(date.split('-')[0])
-            urls = imagery_service.upload_to_s3(png_path, job_id, year)
+            # Update progress (debounced to avoid a commit per tiny bump)
+            async with db_lock:
+                completed += 1
+                progress = int(20 + (completed * progress_per_year))
+                if progress - last_reported >= PROGRESS_REPORT_STEP:
+                    await _update_job(db, job_id, progress=progress)
+                    last_reported = progress
             
-            results.append({
+            return {
                 'year': year,
                 'captureDate': date,
                 'imageUrl': urls['original'],
                 'optimizedUrl': urls['optimized'],
                 'thumbnailUrl': urls['thumbnail']
-            })
-            
-            # Update progress
-            job.progress = int(20 + ((idx + 1) * progress_per_year))
-            db.commit()
+            }, analysis_jpeg
+        
+        # Any failed year fails the whole job: the TaskGroup cancels the remaining years
+        # at the first error, as the sequential pipeline stopped at it
+        try:
+            async with asyncio.TaskGroup() as year_tasks:
+                tasks = [year_tasks.create_task(process_year(year, date)) for year, date in downloads]
+        except ExceptionGroup as failures:
+            raise failures.exceptions[0]
+        outcomes = [task.result() for task in tasks]
+        results = [result for result, _ in outcomes]
+        analysis_images = [jpeg for _, jpeg in outcomes]
         
         # AI Analysis
-        job.progress = 85
-        db.commit()
+        await _update_job(db, job_id, progress=85)
         
-        # Build image paths (one per chosen date/year) and analyze strictly for those years
-        image_paths = [str(imagery_service.temp_dir / f"{job_id}_{d}.png") for d in dates_to_download]
-        ai_analysis = imagery_service.analyze_with_gemini(image_paths, years=years_for_download)
+        # Analyze the in-memory JPEGs (one per chosen date/year) strictly for those years
+        ai_analysis = await imagery_service.analyze_with_gemini(analysis_images, years=years_for_download)
         
         # Build per-year summary 2018-2025
         summary_years = list(range(2018, 2026))
@@ -142,10 +208,12 @@ async def process_imagery_job(job_id: str, coordinates: str, zoom: int, callback
         job.status = JobStatus.COMPLETED
         job.progress = 100
         job.completed_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
+        logger.info("Job %s completed with %d images", job_id, len(results))
         
-        # Cleanup
-        imagery_service.cleanup_temp_files(job_id)
+        # Cleanup now rather than after webhook retries (the files may be in tmpfs)
+        imagery_service.cleanup_temp_files(job_id, temp_files)
+        temp_files.clear()
         
         # Send webhook if provided
         if callback_url:
@@ -169,17 +237,14 @@ async def process_imagery_job(job_id: str, coordinates: str, zoom: int, callback
             try:
                 await webhook_service.send_webhook(callback_url, webhook_payload, event="job.completed")
             except Exception as webhook_error:
-                print(f"Webhook send failed: {webhook_error}")
+                logger.warning("Webhook send failed for job %s: %s", job_id, webhook_error)
         
     except Exception as e:
-        print(f"Job {job_id} failed: {str(e)}")
+        logger.error("Job %s failed: %s", job_id, e)
         
-        # Get job again in case session was closed
-        job = db.query(Job).filter(Job.id == job_id).first()
-        if job:
-            job.status = JobStatus.FAILED
-            job.error_message = str(e)
-            db.commit()
+        # Discard any half-finished transaction before recording the failure
+        await db.rollback()
+        await _update_job(db, job_id, status=JobStatus.FAILED, error_message=str(e))
         
         # Send failure webhook
         if callback_url:
@@ -191,10 +256,20 @@ async def process_imagery_job(job_id: str, coordinates: str, zoom: int, callback
                     'deliveredAt': datetime.utcnow().isoformat() + 'Z'
                 }, event="job.failed")
             except Exception as webhook_error:
-                print(f"Failure webhook send failed: {webhook_error}")
+                logger.warning("Failure webhook send failed for job %s: %s", job_id, webhook_error)
     
     finally:
-        db.close()
+        # Don't leave the speculative availability check (and its CLI) running, or its
+        # error unretrieved, if the job bailed out before awaiting it
+        if availability is not None:
+            if not availability.done():
+                availability.cancel()
+            elif not availability.cancelled():
+                availability.exception()
+        # Failed and cancelled jobs leave their GeoTIFFs too; in tmpfs they would pile up
+        if temp_files:
+            imagery_service.cleanup_temp_files(job_id, temp_files)
+        await db.close()
 
 # Routes
 @app.get("/api/health", response_model=HealthResponse)
@@ -213,6 +288,10 @@ async def capture_imagery(
     db: Session = Depends(get_db)
 ):
     """Start imagery capture job"""
+    # Launch the availability check now so CLI startup overlaps the job insert below
+    lat, lon = map(float, request.coordinates.split(','))
+    availability = asyncio.create_task(imagery_service.check_availability(lat, lon))
+    
     # Create job
     job = Job(
         coordinates=request.coordinates,
@@ -221,9 +300,13 @@ async def capture_imagery(
         callback_url=request.callbackUrl,
         status=JobStatus.QUEUED
     )
-    db.add(job)
-    db.commit()
-    db.refresh(job)
+    try:
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+    except Exception:
+        availability.cancel()
+        raise
     
     # Start background processing
     background_tasks.add_task(
@@ -231,7 +314,8 @@ async def capture_imagery(
         job.id,
         request.coordinates,
         request.zoomLevel,
-        request.callbackUrl
+        request.callbackUrl,
+        availability
     )
     
     return {
@@ -245,7 +329,13 @@ async def capture_imagery(
 @app.get("/api/status/{job_id}", response_model=JobStatusResponse)
 def get_job_status(job_id: str, db: Session = Depends(get_db)):
     """Get job status"""
-    job = db.query(Job).filter(Job.id == job_id).first()
+    # Status polling never needs the (potentially large) JSON result columns
+    job = (
+        db.query(Job)
+        .options(defer(Job.imagery_data), defer(Job.ai_analysis))
+        .filter(Job.id == job_id)
+        .first()
+    )
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -294,7 +384,10 @@ def list_jobs(
     db: Session = Depends(get_db)
 ):
     """List all jobs"""
-    query = db.query(Job).order_by(Job.created_at.desc())
+    # Select only the columns the response needs instead of hydrating full Job rows
+    query = db.query(
+        Job.id, Job.status, Job.progress, Job.created_at, Job.completed_at, Job.error_message
+    ).order_by(Job.created_at.desc())
     
     if status:
         try:
@@ -320,6 +413,8 @@ def list_jobs(
 
 if __name__ == "__main__":
     import uvicorn
+    # Schema is created by the entry point, once, rather than on every worker import
+    Base.metadata.create_all(bind=engine)
     uvicorn.run(
         "app.main:app",
         host=settings.API_HOST,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Enum, Text, JSON
+from sqlalchemy import Column, String, Integer, DateTime, Enum, Text, JSON, Index
 from datetime import datetime
 import uuid
 import enum
@@ -12,6 +12,10 @@ class JobStatus(str, enum.Enum):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Serves GET /api/jobs?status=... ordered by newest first
+        Index('ix_jobs_status_created_at', 'status', 'created_at'),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     coordinates = Column(String, nullable=False)
@@ -27,6 +31,6 @@ class Job(Base):
     ai_analysis = Column(JSON, nullable=True)
     error_message = Column(Text, nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
\ No newline at end of file
@@ -1,27 +1,33 @@
+import re
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from .models import JobStatus
 
+# "lat,lon" with lat in [-90, 90] and lon in [-180, 180]; the range is enforced by
+# the pattern itself, so a single regex match replaces float parsing. Signs, leading
+# zeros and bare fractions ("+045.", ".5") are accepted as float() would
+COORDINATES_PATTERN = (
+    r'^\s*[+-]?0*(?:90(?:\.0*)?|[1-8]?\d(?:\.\d*)?|\.\d+)\s*,'
+    r'\s*[+-]?0*(?:180(?:\.0*)?|(?:1[0-7]\d|[1-9]?\d)(?:\.\d*)?|\.\d+)\s*$'
+)
+_COORDINATES_RE = re.compile(COORDINATES_PATTERN)
+
 # Request Schemas
 class CaptureRequest(BaseModel):
-    coordinates: str = Field(..., description="Latitude,Longitude")
+    coordinates: str = Field(..., description="Latitude,Longitude", json_schema_extra={'pattern': COORDINATES_PATTERN})
     locationName: str = Field(..., description="Human-readable location name")
     zoomLevel: int = Field(18, ge=0, le=23, description="Map zoom level (0-23, default 18 for city detail)")
     callbackUrl: Optional[str] = None
     
     @validator('coordinates')
     def validate_coordinates(cls, v):
-        try:
-            parts = v.split(',')
-            if len(parts) != 2:
-                raise ValueError("Must be 'latitude,longitude'")
-            lat, lon = float(parts[0]), float(parts[1])
-            if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
-                raise ValueError("Invalid coordinate range")
-            return v
-        except Exception as e:
-            raise ValueError(f"Invalid coordinates: {e}")
+        if not _COORDINATES_RE.match(v):
+            raise ValueError(
+                "Invalid coordinates: must be 'latitude,longitude' with latitude "
+                "in [-90, 90] and longitude in [-180, 180]"
+            )
+        return v
     
     @validator('callbackUrl')
     def validate_callback_url(cls, v):
@@ -1,55 +1,184 @@
 import subprocess
 import os
+import shutil
+import re
 import json
 import asyncio
+import logging
+import math
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import hmac
 import hashlib
 import uuid
 import random
+import time
+from collections import OrderedDict
+from io import BytesIO
 from datetime import datetime
+from functools import lru_cache
 import boto3
+import httpx
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
+import numpy as np
 import rasterio
 import google.generativeai as genai
 from .config import settings
 
-# Configure services
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_S3_REGION
-)
-genai.configure(api_key=settings.GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
+
+# Availability dates are printed as YYYY/MM/DD; matched against the raw CLI output bytes
+_DATE_RE = re.compile(rb'\d{4}/\d{2}/\d{2}')
+
+# Optional: libvips encodes PNG considerably faster than Pillow; fall back to Pillow without it
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+# Configure services lazily so importing the app (e.g. for health checks)
+# never builds cloud clients or touches secrets
+@lru_cache(maxsize=1)
+def get_s3_client():
+    """Build the S3 client on first use and reuse it afterwards"""
+    return boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION,
+        # Enough pooled keep-alive connections for every concurrent per-year upload
+        config=BotoConfig(max_pool_connections=max(10, settings.IMAGERY_MAX_CONCURRENCY * 2))
+    )
+
+GEMINI_MODEL_NAME = 'gemini-2.5-flash'
+
+@lru_cache(maxsize=1)
+def get_gemini_model() -> genai.GenerativeModel:
+    """Configure the Gemini SDK and build the model handle once, on first use"""
+    if not settings.GEMINI_API_KEY:
+        raise Exception("GEMINI_API_KEY is not configured")
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
 
 class ImageryService:
     """All imagery processing logic"""
     
     def __init__(self):
         # CRITICAL FIX: Use absolute path so CLI tool can find the directory
-        self.temp_dir = Path(settings.TEMP_STORAGE_PATH).resolve()
+        self.temp_dir = self._resolve_temp_dir()
         self.temp_dir.mkdir(parents=True, exist_ok=True)
-        print(f"[ImageryService] Initialized with temp_dir: {self.temp_dir}")
+        logger.info("ImageryService initialized with temp_dir: %s", self.temp_dir)
+        # (round(lat, 3), round(lon, 3), zoom) -> (fetched_at, dates); ~110m buckets, LRU-ordered
+        self._availability_cache: OrderedDict = OrderedDict()
+        # Same key -> future of the lookup currently running for it
+        self._availability_pending: Dict[Tuple[float, float, int], asyncio.Future] = {}
+    
+    @staticmethod
+    def _resolve_temp_dir() -> Path:
+        """Pick the scratch directory for downloaded GeoTIFFs.
+        An explicit TEMP_STORAGE_PATH wins; otherwise prefer tmpfs, since each file is
+        written once, read once and deleted, unless tmpfs is short on space.
+        """
+        if settings.TEMP_STORAGE_PATH:
+            return Path(settings.TEMP_STORAGE_PATH).resolve()
+        shm = Path('/dev/shm')
+        if shm.is_dir() and os.access(shm, os.W_OK):
+            try:
+                if shutil.disk_usage(shm).free >= settings.TMPFS_MIN_FREE_MB * 1024 * 1024:
+                    return shm / 'geofy'
+            except OSError:
+                pass
+            logger.warning("/dev/shm has less than %d MB free; using disk for temp files", settings.TMPFS_MIN_FREE_MB)
+        return Path('./storage/temp').resolve()
+    
+    def clear_availability_cache(self):
+        """Drop all memoized availability results"""
+        self._availability_cache.clear()
+    
+    async def _run_cli(
+        self,
+        cmd: List[str],
+        timeout: int,
+        text: bool = False,
+        stdout: int = asyncio.subprocess.PIPE
+    ) -> subprocess.CompletedProcess:
+        """Run the GEHistoricalImagery CLI without blocking the event loop.
+        Pass stdout=asyncio.subprocess.DEVNULL when the output is not needed.
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=stdout,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        finally:
+            # Never leave the CLI running behind a timeout or a cancelled job
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        if text:
+            stdout = stdout.decode('utf-8', errors='replace') if stdout is not None else None
+            stderr = stderr.decode('utf-8', errors='replace')
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
         
-    def check_availability(self, lat: float, lon: float, zoom: int = 18) -> List[str]:
+    async def check_availability(self, lat: float, lon: float, zoom: int = 18) -> List[str]:
         """Check available dates using GEHistoricalImagery"""
-        print(f"\n{'='*60}")
-        print(f"[check_availability] Starting availability check")
-        print(f"[check_availability] Coordinates: lat={lat}, lon={lon}, zoom={zoom}")
+        logger.debug("[check_availability] Coordinates: lat=%s, lon=%s, zoom=%s", lat, lon, zoom)
+        
+        # Availability for a point is stable over days: serve repeat lookups from memory
+        cache_key = (round(lat, 3), round(lon, 3), zoom)
+        cached = self._availability_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < settings.AVAILABILITY_CACHE_TTL_SECONDS:
+            self._availability_cache.move_to_end(cache_key)
+            logger.debug("[check_availability] Cache hit for %s: %d dates", cache_key, len(cached[1]))
+            return list(cached[1])
+        
+        # Adjacent clicks tend to arrive together: share one CLI run per bucket
+        while cache_key in self._availability_pending:
+            pending = self._availability_pending[cache_key]
+            logger.debug("[check_availability] Joining in-flight lookup for %s", cache_key)
+            try:
+                return list(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller that started that lookup was cancelled; run our own
+        
+        pending = asyncio.get_running_loop().create_future()
+        self._availability_pending[cache_key] = pending
+        try:
+            dates = await self._lookup_availability(lat, lon, zoom)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            pending.exception()  # mark retrieved in case nobody joined
+            raise
+        finally:
+            del self._availability_pending[cache_key]
+        pending.set_result(tuple(dates))
         
+        self._availability_cache[cache_key] = (time.monotonic(), tuple(dates))
+        self._availability_cache.move_to_end(cache_key)
+        while len(self._availability_cache) > settings.AVAILABILITY_CACHE_MAX_ENTRIES:
+            self._availability_cache.popitem(last=False)
+        
+        return dates
+    
+    async def _lookup_availability(self, lat: float, lon: float, zoom: int) -> List[str]:
+        """Run the availability CLI for one point (uncached)"""
         try:
             # Create a small bounding box around the point (0.001 degree ~= 100m)
             offset = 0.001
             lower_left = f"{lat - offset},{lon - offset}"
             upper_right = f"{lat + offset},{lon + offset}"
             
-            print(f"[check_availability] Bounding box:")
-            print(f"  Lower-left: {lower_left}")
-            print(f"  Upper-right: {upper_right}")
-            
             cmd = [
                 settings.GEHISTORICALIMAGERY_PATH,
                 'availability',
@@ -59,18 +188,12 @@ class ImageryService:
                 '--provider', 'TM'
             ]
             
-            print(f"[check_availability] Executing command:")
-            print(f"  {' '.join(cmd)}")
+            logger.debug("[check_availability] Executing command: %s", cmd)
             
             # FIX: Capture as bytes to handle UTF-16 encoding
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                timeout=60
-            )
+            result = await self._run_cli(cmd, timeout=60)
             
-            print(f"[check_availability] Command completed")
-            print(f"  Return code: {result.returncode}")
+            logger.debug("[check_availability] Command completed with return code %s", result.returncode)
             
             if result.returncode != 0:
                 # Decode stderr for error messages
@@ -82,40 +205,31 @@ class ImageryService:
                 error_msg = f"Command failed with return code {result.returncode}"
                 if stderr_text:
                     error_msg += f"\nError: {stderr_text}"
-                print(f"[check_availability] ERROR: {error_msg}")
                 raise Exception(error_msg)
             
-            # FIX: Decode UTF-16LE output and strip null bytes
-            try:
-                stdout_text = result.stdout.decode('utf-16-le', errors='ignore')
-                stdout_text = stdout_text.replace('\x00', '')
-                print(f"[check_availability] Decoded as UTF-16LE")
-            except:
-                stdout_text = result.stdout.decode('utf-8', errors='ignore')
-                print(f"[check_availability] Decoded as UTF-8")
-            
-            print(f"[check_availability] STDOUT length: {len(stdout_text)} chars")
-            print(f"[check_availability] STDOUT:")
-            print(f"{stdout_text[:500]}...")
+            # The CLI writes UTF-16LE: dropping the null bytes leaves ASCII-compatible
+            # bytes the date regex can scan without decoding the whole buffer
+            stdout_bytes = result.stdout.translate(None, b'\x00')
             
             # Parse output to get available dates
-            print(f"[check_availability] Parsing output for dates...")
-            dates = self._parse_availability_output(stdout_text)
-            print(f"[check_availability] Found {len(dates)} dates: {dates}")
-            print(f"{'='*60}\n")
+            dates = self._parse_availability_output(stdout_bytes)
+            logger.debug("[check_availability] Found %d dates: %s", len(dates), dates)
             
             return dates
             
         except subprocess.TimeoutExpired:
             error_msg = "Availability check timed out after 60 seconds"
-            print(f"[check_availability] ERROR: {error_msg}")
+            logger.error("[check_availability] %s", error_msg)
             raise Exception(error_msg)
         except Exception as e:
-            print(f"[check_availability] EXCEPTION: {type(e).__name__}: {str(e)}")
-            print(f"{'='*60}\n")
+            logger.error("[check_availability] %s: %s", type(e).__name__, e)
             raise Exception(f"Failed to check availability: {str(e)}")
     
-    def download_imagery(
+    def download_path(self, job_id: str, date: str) -> Path:
+        """Where download_imagery writes the GeoTIFF for a job and date"""
+        return self.temp_dir / f"{job_id}_{date}.tif"
+    
+    async def download_imagery(
         self, 
         lat: float, 
         lon: float, 
@@ -123,17 +237,16 @@ class ImageryService:
         zoom: int,
         job_id: str
     ) -> str:
-        """Download imagery for a specific date"""
-        print(f"\n{'='*60}")
-        print(f"[download_imagery] Starting download")
-        print(f"  Job ID: {job_id}")
-        print(f"  Date: {date}")
-        print(f"  Coordinates: lat={lat}, lon={lon}")
-        print(f"  Zoom: {zoom}")
-        
+        """Download imagery for a specific date.
+        One CLI process per date: the `download` command takes a single --date, so
+        callers overlap dates by running these concurrently rather than batching them.
+        """
         # Use absolute path for output
-        output_path = self.temp_dir / f"{job_id}_{date}.tif"
-        print(f"  Output path (absolute): {output_path}")
+        output_path = self.download_path(job_id, date)
+        logger.debug(
+            "[download_imagery] Job %s, date %s, lat=%s, lon=%s, zoom=%s -> %s",
+            job_id, date, lat, lon, zoom, output_path
+        )
         
         try:
             # Create a small bounding box around the point
@@ -141,10 +254,6 @@ class ImageryService:
             lower_left = f"{lat - offset},{lon - offset}"
             upper_right = f"{lat + offset},{lon + offset}"
             
-            print(f"[download_imagery] Bounding box:")
-            print(f"  Lower-left: {lower_left}")
-            print(f"  Upper-right: {upper_right}")
-            
             cmd = [
                 settings.GEHISTORICALIMAGERY_PATH,
                 'download',
@@ -156,159 +265,180 @@ class ImageryService:
                 '--provider', 'TM'
             ]
             
-            print(f"[download_imagery] Executing command:")
-            print(f"  {' '.join(cmd)}")
+            logger.debug("[download_imagery] Executing command: %s", cmd)
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
-            
-            print(f"[download_imagery] Command completed")
-            print(f"  Return code: {result.returncode}")
+            # Only success (return code + output file) matters; the progress output the
+            # CLI prints is only worth draining into memory when it will be logged
+            stdout_target = asyncio.subprocess.PIPE if logger.isEnabledFor(logging.DEBUG) else asyncio.subprocess.DEVNULL
+            result = await self._run_cli(cmd, timeout=300, text=True, stdout=stdout_target)
             
+            logger.debug("[download_imagery] Command completed with return code %s", result.returncode)
             if result.stdout:
-                print(f"[download_imagery] STDOUT:")
-                print(f"{result.stdout}")
-            
+                logger.debug("[download_imagery] STDOUT:\n%s", result.stdout)
             if result.stderr:
-                print(f"[download_imagery] STDERR:")
-                print(f"{result.stderr}")
+                logger.debug("[download_imagery] STDERR:\n%s", result.stderr)
             
             if result.returncode != 0:
                 error_msg = f"Download failed with return code {result.returncode}"
                 if result.stderr:
                     error_msg += f"\nError: {result.stderr}"
-                print(f"[download_imagery] ERROR: {error_msg}")
                 raise Exception(error_msg)
             
             # Check if file was created
             if not output_path.exists():
                 error_msg = f"Output file not created at {output_path}"
-                print(f"[download_imagery] ERROR: {error_msg}")
                 # List files in temp directory for debugging
-                print(f"[download_imagery] Files in temp directory:")
-                for f in self.temp_dir.glob("*"):
-                    print(f"  {f.name} ({f.stat().st_size} bytes)")
+                if logger.isEnabledFor(logging.DEBUG):
+                    listing = [f"{f.name} ({f.stat().st_size} bytes)" for f in self.temp_dir.glob("*")]
+                    logger.debug("[download_imagery] Files in temp directory: %s", listing)
                 raise Exception(error_msg)
             
-            file_size = output_path.stat().st_size
-            print(f"[download_imagery] SUCCESS: File created ({file_size} bytes)")
-            print(f"{'='*60}\n")
+            logger.debug("[download_imagery] File created (%d bytes)", output_path.stat().st_size)
             
             return str(output_path)
             
         except subprocess.TimeoutExpired:
             error_msg = "Download timed out after 300 seconds"
-            print(f"[download_imagery] ERROR: {error_msg}")
-            print(f"{'='*60}\n")
+            logger.error("[download_imagery] %s", error_msg)
             raise Exception(error_msg)
         except Exception as e:
-            print(f"[download_imagery] EXCEPTION: {type(e).__name__}: {str(e)}")
-            print(f"{'='*60}\n")
+            logger.error("[download_imagery] %s: %s", type(e).__name__, e)
             raise Exception(f"Failed to download imagery: {str(e)}")
     
-    def convert_geotiff_to_png(self, tif_path: str) -> str:
-        """Convert GeoTIFF to PNG"""
-        print(f"\n{'='*60}")
-        print(f"[convert_geotiff_to_png] Starting conversion")
-        print(f"  Input: {tif_path}")
-        
-        png_path = tif_path.replace('.tif', '.png')
-        print(f"  Output: {png_path}")
+    @staticmethod
+    def convert_geotiff_to_png(tif_path: str) -> Tuple[bytes, bytes]:
+        """Convert GeoTIFF to in-memory PNG bytes (the PNG never touches disk).
+        Also returns a downscaled JPEG of the same pixels for AI analysis.
+        Stateless so it can be shipped to a process pool.
+        """
+        logger.debug("[convert_geotiff_to_png] Input: %s", tif_path)
         
         try:
             # Check if input file exists
             if not os.path.exists(tif_path):
                 raise Exception(f"Input file does not exist: {tif_path}")
             
-            file_size = os.path.getsize(tif_path)
-            print(f"  Input file size: {file_size} bytes")
-            
-            # Read GeoTIFF
-            print(f"[convert_geotiff_to_png] Opening GeoTIFF...")
-            with rasterio.open(tif_path) as src:
-                print(f"  Image dimensions: {src.width}x{src.height}")
-                print(f"  Number of bands: {src.count}")
-                print(f"  Data type: {src.dtypes[0]}")
-                
-                # Read RGB bands (assuming bands 1,2,3 are RGB)
-                print(f"[convert_geotiff_to_png] Reading RGB bands...")
-                data = src.read([1, 2, 3])
+            # Read GeoTIFF (multi-threaded decompression, larger block cache, and no
+            # readdir() of the shared temp dir hunting for .aux.xml/.ovr sidecars)
+            gdal_env = rasterio.Env(
+                GDAL_NUM_THREADS='ALL_CPUS',
+                GDAL_CACHEMAX=512,
+                GDAL_DISABLE_READDIR_ON_OPEN='EMPTY_DIR'
+            )
+            with gdal_env, rasterio.open(tif_path) as src:
+                logger.debug(
+                    "[convert_geotiff_to_png] %dx%d, %d bands, %s",
+                    src.width, src.height, src.count, src.dtypes[0]
+                )
                 
-                # Convert to PIL Image
-                # Transpose from (bands, height, width) to (height, width, bands)
-                print(f"[convert_geotiff_to_png] Transposing data...")
-                data = data.transpose(1, 2, 0)
+                # Pre-allocate the (height, width, bands) buffer PIL expects, so
+                # bands land in their final layout without a transpose copy
+                data = np.empty((src.height, src.width, 3), dtype=np.uint8)
+                band_view = data.transpose(2, 0, 1)
                 
-                print(f"  Data shape: {data.shape}")
-                print(f"  Data type: {data.dtype}")
-                print(f"  Data range: {data.min()} to {data.max()}")
+                # Read RGB bands (assuming bands 1,2,3 are RGB)
+                if src.dtypes[0] == 'uint8':
+                    src.read([1, 2, 3], out=band_view)
+                elif src.dtypes[0] == 'uint16':
+                    # Fixed-range integer data: keep the top 8 significant bits in one
+                    # pass instead of scanning for min/max first
+                    nbits = int(src.tags(1, ns='IMAGE_STRUCTURE').get('NBITS', 16))
+                    shift = max(nbits - 8, 0)
+                    logger.debug("[convert_geotiff_to_png] Shifting %d-bit data to uint8 (>> %d)", nbits, shift)
+                    for _, window in src.block_windows(1):
+                        block = src.read([1, 2, 3], window=window)
+                        np.right_shift(block, shift, out=block)
+                        np.minimum(block, 255, out=block)
+                        rows, cols = window.toslices()
+                        band_view[:, rows, cols] = block
+                else:
+                    # Ensure data is in uint8 format (0-255 range)
+                    logger.debug("[convert_geotiff_to_png] Normalizing to uint8")
+                    # Stream block by block so only one source-dtype block is resident:
+                    # pass 1 finds the global range, pass 2 scales into the uint8 buffer
+                    windows = [window for _, window in src.block_windows(1)]
+                    lo, hi = None, None
+                    for window in windows:
+                        block = src.read([1, 2, 3], window=window)
+                        # Python floats: hi - lo would overflow in int16/int32 scalars
+                        block_lo, block_hi = float(block.min()), float(block.max())
+                        lo = block_lo if lo is None else min(lo, block_lo)
+                        hi = block_hi if hi is None else max(hi, block_hi)
+                    # Shift into one reused block-sized float32 buffer (never in the source
+                    # dtype, which can overflow), then scale straight into the uint8 buffer:
+                    # no full-size float64 temporaries
+                    scale = np.float32(255.0 / (hi - lo)) if hi > lo else np.float32(0.0)
+                    block_h, block_w = src.block_shapes[0]
+                    scratch = np.empty((3, block_h, block_w), dtype=np.float32)
+                    for window in windows:
+                        block = src.read([1, 2, 3], window=window)
+                        shifted = scratch[:, :block.shape[1], :block.shape[2]]
+                        np.subtract(block, lo, out=shifted, dtype=np.float32)
+                        rows, cols = window.toslices()
+                        np.multiply(shifted, scale, out=band_view[:, rows, cols], casting='unsafe')
                 
-                # Ensure data is in uint8 format (0-255 range)
-                if data.dtype != 'uint8':
-                    print(f"[convert_geotiff_to_png] Normalizing to uint8...")
-                    data = ((data - data.min()) / (data.max() - data.min()) * 255).astype('uint8')
-                    print(f"  Normalized range: {data.min()} to {data.max()}")
+                # PIL can't share an RGB numpy buffer, so unpack it once for both encodes
+                img = Image.fromarray(data, 'RGB')
                 
-                print(f"[convert_geotiff_to_png] Creating PIL Image...")
-                img = Image.fromarray(data)
+                # Encode PNG (low zlib level: encoding dominates conversion time)
+                if pyvips is not None:
+                    vips_img = pyvips.Image.new_from_memory(data.data, src.width, src.height, 3, 'uchar')
+                    png_bytes = vips_img.pngsave_buffer(compression=settings.PNG_COMPRESS_LEVEL)
+                else:
+                    buffer = BytesIO()
+                    img.save(buffer, 'PNG', compress_level=settings.PNG_COMPRESS_LEVEL, optimize=False)
+                    png_bytes = buffer.getvalue()
                 
-                # Save as PNG
-                print(f"[convert_geotiff_to_png] Saving PNG...")
-                img.save(png_path, 'PNG')
+                # Gemini gets a small JPEG built from the buffer we already hold: its
+                # vision input is tile-limited, and JPEG is far smaller than PNG to send.
+                # resize() (unlike thumbnail()) leaves `img` alone, so no full-size copy
+                scale = min(1.0, settings.GEMINI_IMAGE_MAX_SIZE / max(img.size))
+                if scale < 1.0:
+                    preview_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+                    preview = img.resize(preview_size, Image.LANCZOS, reducing_gap=2.0)
+                else:
+                    preview = img
+                buffer = BytesIO()
+                preview.save(buffer, 'JPEG', quality=85, optimize=False)
+                jpeg_bytes = buffer.getvalue()
             
             # Verify output
-            if not os.path.exists(png_path):
-                raise Exception("PNG file was not created")
+            if not png_bytes:
+                raise Exception("PNG encoding produced no data")
             
-            output_size = os.path.getsize(png_path)
-            print(f"[convert_geotiff_to_png] SUCCESS: PNG created ({output_size} bytes)")
-            print(f"{'='*60}\n")
+            logger.debug(
+                "[convert_geotiff_to_png] PNG encoded (%d bytes), analysis JPEG %dx%d (%d bytes)",
+                len(png_bytes), preview.size[0], preview.size[1], len(jpeg_bytes)
+            )
             
-            return png_path
+            return png_bytes, jpeg_bytes
             
         except Exception as e:
-            print(f"[convert_geotiff_to_png] EXCEPTION: {type(e).__name__}: {str(e)}")
-            print(f"{'='*60}\n")
+            logger.error("[convert_geotiff_to_png] %s: %s", type(e).__name__, e)
             raise Exception(f"Failed to convert GeoTIFF: {str(e)}")
     
-    def upload_to_s3(self, image_path: str, job_id: str, year: int) -> Dict[str, str]:
-        """Upload image to S3 and return URLs"""
-        print(f"\n{'='*60}")
-        print(f"[upload_to_s3] Starting upload")
-        print(f"  Image: {image_path}")
-        print(f"  Job ID: {job_id}")
-        print(f"  Year: {year}")
-
+    def upload_to_s3(self, image_data: bytes, job_id: str, year: int) -> Dict[str, str]:
+        """Upload in-memory PNG bytes to S3 and return URLs"""
         try:
-            # Check if file exists
-            if not os.path.exists(image_path):
-                raise Exception(f"Image file does not exist: {image_path}")
-
-            file_size = os.path.getsize(image_path)
-            print(f"  File size: {file_size} bytes")
+            if not image_data:
+                raise Exception("No image data to upload")
 
             # Define S3 key (path in bucket)
             s3_key = f"geofy/{job_id}/imagery_{year}.png"
 
-            # Upload original to S3
-            print(f"[upload_to_s3] Uploading to S3...")
-            with open(image_path, 'rb') as file_data:
-                s3_client.upload_fileobj(
-                    file_data,
-                    settings.AWS_S3_BUCKET_NAME,
-                    s3_key,
-                    ExtraArgs={
-                        'ContentType': 'image/png'
-                    }
-                )
+            # Upload original to S3 - a single PUT of the in-memory bytes; the
+            # multipart transfer manager (threads + chunking) buys nothing at this size
+            get_s3_client().put_object(
+                Bucket=settings.AWS_S3_BUCKET_NAME,
+                Key=s3_key,
+                Body=image_data,
+                ContentType='image/png'
+            )
 
-            print(f"[upload_to_s3] Upload successful")
-            print(f"  S3 Key: {s3_key}")
-            print(f"  Bucket: {settings.AWS_S3_BUCKET_NAME}")
+            logger.debug(
+                "[upload_to_s3] Uploaded %d bytes to s3://%s/%s",
+                len(image_data), settings.AWS_S3_BUCKET_NAME, s3_key
+            )
 
             # Generate public URL
             base_url = f"https://{settings.AWS_S3_BUCKET_NAME}.s3.{settings.AWS_S3_REGION}.amazonaws.com/{s3_key}"
@@ -321,46 +451,36 @@ class ImageryService:
                 'thumbnail': base_url
             }
 
-            print(f"[upload_to_s3] URLs generated:")
-            print(f"  URL: {urls['original'][:80]}...")
-            print(f"{'='*60}\n")
-
             return urls
 
         except ClientError as e:
-            print(f"[upload_to_s3] AWS ERROR: {type(e).__name__}: {str(e)}")
-            print(f"{'='*60}\n")
+            logger.error("[upload_to_s3] AWS error: %s: %s", type(e).__name__, e)
             raise Exception(f"Failed to upload to S3: {str(e)}")
         except Exception as e:
-            print(f"[upload_to_s3] EXCEPTION: {type(e).__name__}: {str(e)}")
-            print(f"{'='*60}\n")
+            logger.error("[upload_to_s3] %s: %s", type(e).__name__, e)
             raise Exception(f"Failed to upload to S3: {str(e)}")
     
-    def analyze_with_gemini(self, image_paths: List[str], years: Optional[List[int]] = None) -> Dict[str, Any]:
-        """Analyze images with Gemini AI"""
-        print(f"\n{'='*60}")
-        print(f"[analyze_with_gemini] Starting AI analysis")
-        print(f"  Number of images: {len(image_paths)}")
+    async def analyze_with_gemini(self, image_blobs: List[bytes], years: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Analyze in-memory JPEG images with Gemini AI (sent as one labeled mosaic)"""
+        logger.debug("[analyze_with_gemini] Starting AI analysis of %d images", len(image_blobs))
         
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            print(f"[analyze_with_gemini] Model initialized: gemini-2.5-flash")
-            
-            # Prepare images
-            images = []
-            for idx, path in enumerate(image_paths):
-                print(f"[analyze_with_gemini] Loading image {idx+1}/{len(image_paths)}: {path}")
-                if os.path.exists(path):
-                    file_size = os.path.getsize(path)
-                    print(f"  File exists ({file_size} bytes)")
-                    img = Image.open(path)
-                    print(f"  Image loaded: {img.size[0]}x{img.size[1]} {img.mode}")
-                    images.append(img)
+            model = get_gemini_model()
+            
+            # Label each frame with its year (image_blobs and years are in the same order)
+            if years and len(years) == len(image_blobs):
+                labels = [str(y) for y in years]
+            else:
+                labels = [str(idx + 1) for idx in range(len(image_blobs))]
+            frames = []
+            for idx, (label, blob) in enumerate(zip(labels, image_blobs)):
+                if blob:
+                    frames.append((label, blob))
                 else:
-                    print(f"  WARNING: File does not exist!")
+                    logger.warning("[analyze_with_gemini] Image %d/%d is empty", idx + 1, len(image_blobs))
             
-            if not images:
-                print(f"[analyze_with_gemini] ERROR: No valid images found")
+            if not frames:
+                logger.error("[analyze_with_gemini] No valid images found")
                 return {
                     "error": "No valid images found for analysis",
                     "changes_detected": [],
@@ -368,13 +488,17 @@ class ImageryService:
                     "summary": "Analysis unavailable - no images"
                 }
             
-            print(f"[analyze_with_gemini] Successfully loaded {len(images)} images")
+            # One contact sheet instead of one image part per year: fewer tokens and parts
+            mosaic, cols, rows = await asyncio.to_thread(self._build_mosaic, frames)
             
             # Create prompt
             constrained_years = years or []
             constrained_years_str = ", ".join(str(y) for y in sorted(constrained_years)) if constrained_years else "2018-2025"
             prompt = f"""
-            Analyze ONLY the provided images in strict chronological order. Do not infer or include years not present.
+            The imagery is ONE mosaic of {len(frames)} tiles in a grid of {cols} columns by {rows} rows, in
+            chronological order read row-major (left-to-right, top-to-bottom). Each tile shows the same location
+            and is labeled with its year in its top-left corner.
+            Analyze ONLY the provided tiles in strict chronological order. Do not infer or include years not present.
             Strict years to consider: {constrained_years_str}
             Your primary goal: detect structural development across years (e.g., NEW buildings constructed, significant expansions, paved vs unpaved roads), with emphasis on identifying new buildings per year.
 
@@ -395,17 +519,17 @@ class ImageryService:
             """
             
             # Generate analysis
-            print(f"[analyze_with_gemini] Sending request to Gemini API...")
+            logger.debug(
+                "[analyze_with_gemini] Sending %dx%d mosaic (%d bytes) to %s",
+                cols, rows, len(mosaic), GEMINI_MODEL_NAME
+            )
             try:
                 # Some versions of google-generativeai do not support request_options.
                 # Use basic call; rely on client/library timeouts.
-                response = model.generate_content([prompt] + images)
+                response = await model.generate_content_async([prompt, {'mime_type': 'image/jpeg', 'data': mosaic}])
             except TypeError as te:
                 # Capture detailed error context for debugging
-                import traceback
-                tb = traceback.format_exc()
-                print(f"[analyze_with_gemini] TYPE ERROR: {str(te)}")
-                print(f"[analyze_with_gemini] TRACEBACK:\n{tb}")
+                logger.exception("[analyze_with_gemini] Type error: %s", te)
                 hint = "Remove unsupported parameters like request_options; upgrade/downgrade google-generativeai to a compatible version."
                 return {
                     "error": "AI analysis failed during request construction",
@@ -417,10 +541,7 @@ class ImageryService:
                     "summary": "Analysis unavailable due to request construction error"
                 }
             except Exception as e:
-                import traceback
-                tb = traceback.format_exc()
-                print(f"[analyze_with_gemini] REQUEST ERROR: {type(e).__name__}: {str(e)}")
-                print(f"[analyze_with_gemini] TRACEBACK:\n{tb}")
+                logger.exception("[analyze_with_gemini] Request error: %s: %s", type(e).__name__, e)
                 return {
                     "error": "AI analysis failed during request",
                     "exceptionType": type(e).__name__,
@@ -429,31 +550,24 @@ class ImageryService:
                     "timeline": [],
                     "summary": "Analysis unavailable due to request error"
                 }
-            print(f"[analyze_with_gemini] Response received")
             
             # Parse response - handle potential markdown wrapping
             response_text = (response.text or "").strip()
-            print(f"[analyze_with_gemini] Response length: {len(response_text)} chars")
-            print(f"[analyze_with_gemini] First 200 chars: {response_text[:200]}")
+            logger.debug("[analyze_with_gemini] Response received (%d chars)", len(response_text))
             
             # Remove markdown code blocks if present
             if response_text.startswith('```json'):
-                print(f"[analyze_with_gemini] Removing ```json wrapper")
                 response_text = response_text.replace('```json', '').replace('```', '').strip()
             elif response_text.startswith('```'):
-                print(f"[analyze_with_gemini] Removing ``` wrapper")
                 response_text = response_text.replace('```', '').strip()
             
             try:
-                print(f"[analyze_with_gemini] Parsing JSON...")
                 analysis = json.loads(response_text)
-                print(f"[analyze_with_gemini] JSON parsed successfully")
             except json.JSONDecodeError as je:
-                import traceback
-                tb = traceback.format_exc()
-                print(f"[analyze_with_gemini] JSON parsing failed: {str(je)}")
-                print(f"[analyze_with_gemini] TRACEBACK:\n{tb}")
-                print(f"[analyze_with_gemini] Raw response: {response_text[:500]}")
+                logger.exception(
+                    "[analyze_with_gemini] JSON parsing failed: %s; raw response: %s",
+                    je, response_text[:500]
+                )
                 return {
                     "error": "AI response was not valid JSON",
                     "exceptionType": type(je).__name__,
@@ -469,7 +583,7 @@ class ImageryService:
             missing_keys = [key for key in required_keys if key not in analysis]
             
             if missing_keys:
-                print(f"[analyze_with_gemini] WARNING: Missing keys: {missing_keys}")
+                logger.warning("[analyze_with_gemini] Missing keys: %s", missing_keys)
                 return {
                     "error": f"AI response missing required fields: {missing_keys}",
                     "changes_detected": analysis.get("changes_detected", []),
@@ -485,20 +599,15 @@ class ImageryService:
                 per_year = analysis.get("per_year_changes", [])
                 analysis["per_year_changes"] = [entry for entry in per_year if isinstance(entry, dict) and entry.get("year") in allowed]
             
-            print(f"[analyze_with_gemini] Analysis complete:")
-            print(f"  Changes detected: {len(analysis['changes_detected'])}")
-            print(f"  Timeline entries: {len(analysis['timeline'])}")
-            print(f"  Summary length: {len(analysis['summary'])} chars")
-            print(f"{'='*60}\n")
+            logger.debug(
+                "[analyze_with_gemini] Analysis complete: %d changes, %d timeline entries",
+                len(analysis['changes_detected']), len(analysis['timeline'])
+            )
             
             return analysis
             
         except Exception as e:
-            import traceback
-            tb = traceback.format_exc()
-            print(f"[analyze_with_gemini] EXCEPTION: {type(e).__name__}: {str(e)}")
-            print(tb)
-            print(f"{'='*60}\n")
+            logger.exception("[analyze_with_gemini] %s: %s", type(e).__name__, e)
             return {
                 "error": f"AI analysis failed: {str(e)}",
                 "exceptionType": type(e).__name__,
@@ -508,87 +617,96 @@ class ImageryService:
                 "summary": "Analysis unavailable due to error"
             }
     
-    def cleanup_temp_files(self, job_id: str):
-        """Clean up temporary files for a job"""
-        print(f"\n{'='*60}")
-        print(f"[cleanup_temp_files] Cleaning up files for job: {job_id}")
-        
-        try:
-            files_deleted = 0
-            for file in self.temp_dir.glob(f"{job_id}_*"):
-                print(f"  Deleting: {file.name}")
-                file.unlink()
+    @staticmethod
+    def _build_mosaic(frames: List[Tuple[str, bytes]]) -> Tuple[bytes, int, int]:
+        """Tile (label, JPEG bytes) frames row-major into one labeled JPEG.
+        Returns the JPEG bytes and the grid's column and row counts.
+        """
+        tiles = [(label, Image.open(BytesIO(blob)).convert('RGB')) for label, blob in frames]
+        cols = math.ceil(math.sqrt(len(tiles)))
+        rows = math.ceil(len(tiles) / cols)
+        gutter = 4
+        cell_w = max(img.width for _, img in tiles) + gutter
+        cell_h = max(img.height for _, img in tiles) + gutter
+        sheet = Image.new('RGB', (cols * cell_w - gutter, rows * cell_h - gutter))
+        draw = ImageDraw.Draw(sheet)
+        font = ImageFont.load_default(size=max(16, cell_h // 16))
+        for idx, (label, img) in enumerate(tiles):
+            x, y = (idx % cols) * cell_w, (idx // cols) * cell_h
+            sheet.paste(img, (x, y))
+            # Label on a dark box so it stays legible over bright imagery
+            left, top, right, bottom = draw.textbbox((x + 8, y + 8), label, font=font)
+            draw.rectangle((left - 4, top - 4, right + 4, bottom + 4), fill=(0, 0, 0))
+            draw.text((x + 8, y + 8), label, fill=(255, 255, 255), font=font)
+        buffer = BytesIO()
+        sheet.save(buffer, 'JPEG', quality=85, optimize=False)
+        return buffer.getvalue(), cols, rows
+    
+    def cleanup_temp_files(self, job_id: str, paths: List[str]):
+        """Clean up the temporary files tracked for a job"""
+        files_deleted = 0
+        for path in paths:
+            try:
+                os.unlink(path)
                 files_deleted += 1
-            
-            print(f"[cleanup_temp_files] Deleted {files_deleted} files")
-            print(f"{'='*60}\n")
-        except Exception as e:
-            print(f"[cleanup_temp_files] WARNING: Cleanup failed: {e}")
-            print(f"{'='*60}\n")
+            except FileNotFoundError:
+                # Never written (e.g. the download failed early) or already removed
+                pass
+            except OSError as e:
+                # Keep going: one stuck file must not leave the rest behind
+                logger.warning("[cleanup_temp_files] Could not delete %s for job %s: %s", path, job_id, e)
+        
+        logger.debug("[cleanup_temp_files] Deleted %d files for job %s", files_deleted, job_id)
     
-    def _parse_availability_output(self, output: str) -> List[str]:
+    def _parse_availability_output(self, output: bytes) -> List[str]:
         """Parse GEHistoricalImagery availability output"""
-        print(f"[_parse_availability_output] Parsing output...")
-        print(f"  Output length: {len(output)} chars")
-        
-        dates = []
-        
         try:
-            # Print first 500 chars for debugging
-            print(f"[_parse_availability_output] First 500 chars of output:")
-            print(f"--- START OUTPUT ---")
-            print(output[:500])
-            print(f"--- END OUTPUT ---")
-            
-            # Split output into lines
-            lines = output.strip().split('\n')
-            print(f"[_parse_availability_output] Number of lines: {len(lines)}")
-            
-            # Look for dates in YYYY/MM/DD format
-            import re
-            date_pattern = r'\d{4}/\d{2}/\d{2}'
-            
-            for idx, line in enumerate(lines):
-                matches = re.findall(date_pattern, line)
-                if matches:
-                    print(f"  Line {idx}: Found {len(matches)} dates: {matches}")
-                    # Convert YYYY/MM/DD to YYYY-MM-DD
-                    for match in matches:
-                        date_normalized = match.replace('/', '-')
-                        dates.append(date_normalized)
-            
-            # Remove duplicates and sort
-            dates = sorted(list(set(dates)))
-            print(f"[_parse_availability_output] After deduplication: {len(dates)} unique dates")
+            # Look for dates in YYYY/MM/DD format in one scan over the whole output
+            matches = _DATE_RE.findall(output)
+            
+            # Remove duplicates, convert YYYY/MM/DD to YYYY-MM-DD and sort
+            dates = sorted({match.decode('ascii').replace('/', '-') for match in matches})
             
             if not dates:
-                print(f"[_parse_availability_output] ERROR: No dates found in output")
+                logger.debug("[_parse_availability_output] No dates in output: %s", output[:500])
                 raise Exception("No imagery dates found for this location")
             
-            print(f"[_parse_availability_output] Final result: {dates}")
             return dates
             
         except Exception as e:
-            print(f"[_parse_availability_output] EXCEPTION: {type(e).__name__}: {str(e)}")
+            logger.error("[_parse_availability_output] %s: %s", type(e).__name__, e)
             raise Exception(f"Failed to parse availability dates: {str(e)}")
 
 
 class WebhookService:
     """Handle webhook callbacks"""
     
+    # Shared across deliveries and retries so connections (and TLS sessions) are reused
+    _client: Optional[httpx.AsyncClient] = None
+    
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """Return the pooled webhook HTTP client, creating it on first use"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                timeout=settings.WEBHOOK_REQUEST_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_keepalive_connections=64)
+            )
+        return cls._client
+    
+    @classmethod
+    async def close(cls):
+        """Close the pooled webhook HTTP client (called on app shutdown)"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+    
     @staticmethod
     async def send_webhook(url: str, payload: Dict[str, Any], event: Optional[str] = None) -> bool:
         """Send webhook with retry logic and optional HMAC signature.
         Adds standard headers and exponential backoff. Returns True on 2xx.
         """
-        import httpx
-        from .config import settings
-        
-        print(f"\n{'='*60}")
-        print(f"[send_webhook] Sending webhook to: {url}")
-        print(f"  Payload keys: {list(payload.keys())}")
-        if event:
-            print(f"  Event: {event}")
+        logger.debug("[send_webhook] Sending %s webhook to: %s", event, url)
         
         # Prepare headers
         delivery_id = str(uuid.uuid4())
@@ -599,11 +717,13 @@ class WebhookService:
             'Geofy-Delivery-Id': delivery_id
         }
         
+        # Serialize once: the same bytes are signed and sent on every attempt
+        payload_bytes = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        
         # Attach timestamp and compute signature if secret provided
         timestamp = str(int(datetime.utcnow().timestamp()))
         signature_header = None
         if settings.WEBHOOK_SIGNING_SECRET:
-            payload_bytes = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
             base_string = f"t={timestamp}.body=".encode('utf-8') + payload_bytes
             mac = hmac.new(settings.WEBHOOK_SIGNING_SECRET.encode('utf-8'), base_string, hashlib.sha256)
             signature = mac.hexdigest()
@@ -614,29 +734,29 @@ class WebhookService:
             headers['Geofy-Timestamp'] = timestamp
         
         max_retries = settings.WEBHOOK_MAX_RETRIES
+        client = WebhookService.get_client()
         for attempt in range(max_retries):
             try:
-                print(f"[send_webhook] Attempt {attempt + 1}/{max_retries}")
-                timeout = settings.WEBHOOK_REQUEST_TIMEOUT_SECONDS
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    response = await client.post(url, json=payload, headers=headers)
-                    print(f"  Response status: {response.status_code}")
-                    
-                    if 200 <= response.status_code < 300:
-                        print(f"[send_webhook] SUCCESS")
-                        print(f"{'='*60}\n")
-                        return True
-                    print(f"  Response body: {response.text[:200]}")
-                    # Retry only on network-ish conditions: 5xx and 429
-                    if not (response.status_code >= 500 or response.status_code == 429):
-                        print(f"[send_webhook] Non-retryable status {response.status_code}")
-                        return False
+                response = await client.post(url, content=payload_bytes, headers=headers)
+                logger.debug(
+                    "[send_webhook] Attempt %d/%d: status %s",
+                    attempt + 1, max_retries, response.status_code
+                )
+                
+                if 200 <= response.status_code < 300:
+                    return True
+                logger.warning(
+                    "[send_webhook] %s responded %s: %s",
+                    url, response.status_code, response.text[:200]
+                )
+                # Retry only on network-ish conditions: 5xx and 429
+                if not (response.status_code >= 500 or response.status_code == 429):
+                    return False
             except Exception as e:
-                print(f"  Exception: {type(e).__name__}: {str(e)}")
+                logger.warning("[send_webhook] Attempt %d/%d: %s: %s", attempt + 1, max_retries, type(e).__name__, e)
             
             if attempt == max_retries - 1:
-                print(f"[send_webhook] FAILED after {max_retries} attempts")
-                print(f"{'='*60}\n")
+                logger.error("[send_webhook] FAILED after %d attempts: %s", max_retries, url)
                 return False
             # Compute backoff with optional Retry-After support and jitter
             retry_after_header = None
@@ -650,15 +770,13 @@ class WebhookService:
                     # Retry-After can be seconds or an HTTP-date; handle seconds form
                     ra_seconds = int(retry_after_header)
                     wait_time = max(wait_time, ra_seconds)
-                    print(f"  Honoring Retry-After: {ra_seconds}s")
                 except ValueError:
                     # If not integer, keep exponential backoff (parsing HTTP-date omitted for simplicity)
-                    print(f"  Retry-After not numeric; using exponential backoff")
+                    pass
             # Full jitter: randomize between 0 and wait_time
             jittered_wait = random.uniform(0, wait_time)
-            print(f"  Waiting {jittered_wait:.2f}s before retry...")
+            logger.debug("[send_webhook] Waiting %.2fs before retry", jittered_wait)
             await asyncio.sleep(jittered_wait)
         
-        print(f"[send_webhook] FAILED")
-        print(f"{'='*60}\n")
+        logger.error("[send_webhook] FAILED: %s", url)
         return False
\ No newline at end of file
@@ -6,10 +6,16 @@ import uvicorn
 from app.config import settings
 
 if __name__ == "__main__":
+    # Create the schema once here so multiple workers don't race on CREATE TABLE
+    from app.database import Base, engine
+    from app import models  # noqa: F401 - registers tables on Base
+    Base.metadata.create_all(bind=engine)
+    
     uvicorn.run(
         "app.main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
         reload=settings.DEBUG,
+        workers=1 if settings.DEBUG else settings.API_WORKERS,
         log_level="info" if not settings.DEBUG else "debug"
     )
\ No newline at end of file